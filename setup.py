@@ -36,6 +36,17 @@ Usage
 
 Release History
 ---------------
+Unreleased
+==========
+**API Changes**
+ * ``Bundle`` now uses ``__slots__``; setting attributes other than the documented ones raises
+   ``AttributeError`` (use ``Bundle.obj`` to carry extra data)
+ * Sending requests on a closed ``Requests`` instance raises ``RuntimeError``
+ * ``maxBufferedResponses`` must be None or an integer of at least 1
+**Features**
+ * ``Requests.close``, and ``Requests`` can be used as a context manager
+ * ``patch`` accepts ``softMaxConnections`` and ``forceGCGeneration``
+
 1.1.0 (May 01, 2014)
 ======================
 **API Changes**
@@ -67,6 +78,7 @@ setup(
     long_description=__doc__,
     install_requires=[
         'gevent >= 1.0',
+        'monotonic >= 0.1; python_version < "3.3"',
         'requests >= 2.1.0'
     ],
     packages=['simple_requests'],
@@ -53,6 +53,13 @@ Usage
             # regex to parse the HTML (see http://stackoverflow.com/a/1732454)
             friends_response.html
 
+Performance
+-----------
+
+On Windows, gevent (>= 1.3) uses the libuv event loop by default, which spawns and schedules greenlets noticeably slower than libev.  If your gevent build includes libev, consider selecting it by setting the environment variable ``GEVENT_LOOP=libev-cext`` before the program starts.  The event loop is a process-wide setting, so simple-requests leaves this choice to you.
+
+Similarly, gevent (>= 1.3) records which greenlet spawned which on every spawn.  Nothing in simple-requests needs this, so unless your application does, setting ``GEVENT_TRACK_GREENLET_TREE=false`` saves that bookkeeping for each request.
+
 API
 ---
 """
@@ -67,9 +74,9 @@ __copyright__ = 'Copyright 2013 Corey Theiss'
 # This needs to be first
 import gevent.monkey; gevent.monkey.patch_all(thread=False, select=False)
 
-from compat import HTTPError
-from simple_requests import Requests, ResponsePreprocessor
-from strategy import Strict, Lenient, Backoff
-from monkey import patch
+from .compat import HTTPError
+from .simple_requests import Requests, ResponsePreprocessor
+from .strategy import Strict, Lenient, Backoff
+from .monkey import patch
 
 __all__ = ( 'Requests', 'ResponsePreprocessor', 'Strict', 'Lenient', 'Backoff', 'HTTPError', 'patch' )
@@ -9,6 +9,12 @@ else:
     from httplib import HTTPResponse, IncompleteRead
     from urllib2 import HTTPError as _HTTPError
 
+try:
+    from time import monotonic
+except ImportError:
+    # Backport (https://pypi.python.org/pypi/monotonic), installed as a dependency before Python 3.3
+    from monotonic import monotonic
+
 class HTTPError(_HTTPError):
     """Encapsulates HTTP errors (status codes in the 400s and 500s).
 
@@ -9,10 +9,11 @@ into consideration when using them in a production environment.
 
 allowIncompleteResponses
 ------------------------
-Affects [httplib](https://docs.python.org/2/library/httplib.html).  Allows
-continued processing when the actual amount of data is different than the
-amount specified ahead of time by the server (using the content-length
-header).  What are the possible scenarios?
+Affects [urllib3](https://github.com/shazow/urllib3), by changing the
+[httplib](https://docs.python.org/2/library/httplib.html) response class its
+connections use.  Allows continued processing when the actual amount of data
+is different than the amount specified ahead of time by the server (using the
+content-length header).  What are the possible scenarios?
 - The server calculated the content-length incorrectly, and you actually got
   all the data.  This patch will fix this scenario.  This happens surprisingly
   often.
@@ -23,8 +24,9 @@ header).  What are the possible scenarios?
   or JSON, it will almost certainly be invalid. So, in many cases, you'll get
   an error raised anyways.
 
-Note that this patch affects **all** python http connections, even those
-outside of simple-requests, requests, and urllib3.
+Note that this patch affects all `urllib3` connections, even those outside of
+simple-requests (for instance, anything else using requests).  Other users of
+httplib are not affected.
 
 avoidTooManyOpenFiles
 -----------------------
@@ -44,19 +46,29 @@ increasing faster than they can be closed, and eventually, you get
 `socket.error: [Errno 24] Too many open files`.  After this point, it's
 probably unrecoverable.
 
-How many open connections can you have before this is a problem?  On many
-systems, around 900.
+How many open connections can you have before this is a problem?  That
+depends on the limit on open files (`ulimit -n`), which on many systems is
+1024.
 
 This patch will add a speed-limit to the creation of new `urllib3` connections.
-As long as there are fewer than 200 open connections, new ones will be
-created immediately.  After that point, new connections are opened at a rate
-of 1 every 10 seconds.  Once the number of open connections drops to below
-200, they are created immediately again.
-
-In addition to the speed-limit, for every 200 connections opened after 200 are
-already open, the garbage collector is forcefully run.  Testing has shown that
+As long as there are fewer than `softMaxConnections` open connections, new
+ones will be created immediately.  After that point, new connections are
+opened at a rate of 1 every 10 seconds.  Once the number of open connections
+drops to below `softMaxConnections`, they are created immediately again.
+
+By default, `softMaxConnections` is half of the process's limit on open files
+(but at least 50), or 200 if that limit can't be determined (e.g. on Windows).
+It can also be passed to `patch` directly; calling `patch` again with a
+different value re-applies the patch with it.
+
+In addition to the speed-limit, for every 200 connections opened after
+`softMaxConnections` are already open, the garbage collector is forcefully run.  Testing has shown that
 this can help close sockets lingering in a CLOSE_WAIT state (which counts as an
-open file).
+open file).  By default this is a full collection; on programs with very large
+heaps, a younger generation (see `gc.collect`) is much cheaper, at the risk of
+missing sockets that have already been promoted to the oldest one.  The
+generation can be passed to `patch` as `forceGCGeneration` (which, like
+`softMaxConnections`, re-applies the patch if it changes).
 
 Why is a speed-limit used instead of just blocking new connections from
 being opened?  Because there are scenarios where this would cause a deadlock:
@@ -75,24 +87,34 @@ requests, and even the speed limit isn't helping, your best options are:
 """
 
 from gc import collect
+from weakref import WeakSet
+
+try:
+    from resource import getrlimit, RLIMIT_NOFILE
+except ImportError:
+    getrlimit = None
 
-from compat import HTTPResponse, IncompleteRead
+from .compat import HTTPResponse, IncompleteRead, monotonic
 
 from gevent import sleep, spawn
-from gevent.lock import BoundedSemaphore
+from gevent.lock import RLock, Semaphore
 
 from requests.packages.urllib3.connection import HTTPConnection, HTTPSConnection
 
-def patch(allowIncompleteResponses = False, avoidTooManyOpenFiles = False):
-    if allowIncompleteResponses:
-        _patch_allowIncompleteResponses()
-    else:
-        _unpatch_allowIncompleteResponses()
-    
-    if avoidTooManyOpenFiles:
-        _patch_avoidTooManyOpenFiles()
-    else:
-        _unpatch_avoidTooManyOpenFiles()
+def patch(allowIncompleteResponses = False, avoidTooManyOpenFiles = False, softMaxConnections = None, forceGCGeneration = 2):
+    # Unpatching yields (while releasing waiting connections), so don't let another patch() in half-way
+    with _lock:
+        if allowIncompleteResponses:
+            _patch_allowIncompleteResponses()
+        else:
+            _unpatch_allowIncompleteResponses()
+
+        if avoidTooManyOpenFiles:
+            _patch_avoidTooManyOpenFiles(softMaxConnections, forceGCGeneration = forceGCGeneration)
+        else:
+            _unpatch_avoidTooManyOpenFiles()
+
+_lock = RLock()
 
 
 _applied = {
@@ -103,28 +125,41 @@ _applied = {
 
 class _LeakySemaphore(object):
     def __init__(self, value = 1, maxSeconds = 10):
-        self._semaphore = BoundedSemaphore(value)
+        self._semaphore = Semaphore(value) # Leaks push it past value, so release() checks the bound itself
         self._maxSeconds = maxSeconds
-        self._timer = None
+        self._leaker = None
+        self._lastAcquire = 0
+        self._inUse = 0
+        self._waiting = 0
         self._leaked = 0
         self._stopped = False
 
     def _leak(self):
-        sleep(self._maxSeconds)
-        self._leaked += 1
-        self._semaphore.release()
+        # A single greenlet lets one waiter through every maxSeconds, for as long as anybody is waiting
+        while self.waiting > 0 and not self._stopped:
+            wait = self._lastAcquire + self._maxSeconds - monotonic()
+            if wait <= 0:
+                self._leaked += 1
+                self._lastAcquire = monotonic()
+                self._semaphore.release()
+            # Always yield, otherwise the waiter that was just released never gets to run (e.g. if maxSeconds <= 0)
+            sleep(max(wait, 0))
+        self._leaker = None
 
     @property
     def inUse(self):
-        return self._semaphore._initial_value - self.semaphore.counter
+        return self._inUse
 
     @property
     def waiting(self):
-        return len(self._semaphore._links)
+        return self._waiting
 
     def release(self):
         if self._stopped:
             return
+        if self._inUse <= 0:
+            raise ValueError('Semaphore released too many times')
+        self._inUse -= 1
         if self._leaked > 0:
             self._leaked -= 1
         else:
@@ -133,114 +168,136 @@ class _LeakySemaphore(object):
     def stop(self):
         self._stopped = True
 
-        if self._timer is not None:
-            self._timer.kill(block = False)
-            self._timer = None
+        if self._leaker is not None:
+            self._leaker.kill(block = False)
+            self._leaker = None
 
-        while self.waiting > 0:
+        while self._waiting > 0:
             self._semaphore.release()
-            sleep(0.1)
+            # Yield just long enough for the waiter that was woken to leave
+            sleep(0)
 
     def acquire(self):
+        """Returns True if all slots were in use, so that the caller had to wait (or was let through by a leak)"""
         if self._stopped:
-            return
-        if self._semaphore.locked() and not self._timer:
-            self._timer = spawn(self._leak)
-        self._semaphore.acquire(blocking = True, timeout = None)
-        if self._timer is not None:
-            self._timer.kill(block = False)
-            self._timer = None
-            if self.waiting > 0:
-                self._timer = spawn(self._leak)
+            return False
+        waited = self._semaphore.locked()
+        if waited:
+            if self._leaker is None:
+                # Start the clock now, rather than from whenever the last connection happened to be opened
+                self._lastAcquire = monotonic()
+                self._leaker = spawn(self._leak)
+            self._waiting += 1
+            try:
+                self._semaphore.acquire(blocking = True, timeout = None)
+            finally:
+                self._waiting -= 1
+        else:
+            self._semaphore.acquire(blocking = True, timeout = None)
+        self._inUse += 1
+        self._lastAcquire = monotonic()
+        return waited
+
 
+class _LenientHTTPResponse(HTTPResponse):
+    def read(self, amt = None):
+        try:
+            return HTTPResponse.read(self, amt)
+        except IncompleteRead as e:
+            return e.partial
 
 def _patch_allowIncompleteResponses():
     if not _applied['allowIncompleteResponses']:
         _applied['allowIncompleteResponses'] = True
-        def _simple_new_read(self, amt = None):
-            try:
-                return self._simple_old_read(amt)
-            except IncompleteRead as e:
-                return e.partial
-        HTTPResponse._simple_old_read = HTTPResponse.read
-        HTTPResponse.read = _simple_new_read
+        # Set on urllib3's subclass, rather than httplib's HTTPConnection, so that only urllib3 is affected
+        HTTPConnection._simple_old_response_class = HTTPConnection.__dict__.get('response_class')
+        HTTPConnection.response_class = _LenientHTTPResponse
 
 def _unpatch_allowIncompleteResponses():
     if _applied['allowIncompleteResponses']:
         _applied['allowIncompleteResponses'] = False
-        HTTPResponse.read = HTTPResponse._simple_old_read
-        del HTTPResponse._simple_old_read
-
+        if HTTPConnection._simple_old_response_class is None:
+            del HTTPConnection.response_class
+        else:
+            HTTPConnection.response_class = HTTPConnection._simple_old_response_class
+        del HTTPConnection._simple_old_response_class
+
+
+def _defaultSoftMaxConnections():
+    if getrlimit is not None:
+        soft = getrlimit(RLIMIT_NOFILE)[0]
+        if soft > 0: # RLIM_INFINITY can be negative
+            # Leave the other half for everything else that needs a file
+            return max(soft // 2, 50)
+    return 200
+
+_openConnections = None # The _LeakySemaphore in use while avoidTooManyOpenFiles is applied
+_openConnectionsSettings = None # The arguments it was applied with
+
+def _patch_avoidTooManyOpenFiles(softMaxConnections = None, maxSeconds = 10, forceGCInterval = 200, forceGCGeneration = 2):
+    global _openConnections, _openConnectionsSettings
+    if softMaxConnections is None:
+        softMaxConnections = _defaultSoftMaxConnections()
+    settings = ( softMaxConnections, maxSeconds, forceGCInterval, forceGCGeneration )
+    if _applied['avoidTooManyOpenFiles'] and settings != _openConnectionsSettings:
+        # Re-apply, rather than silently keeping the settings already in effect
+        _unpatch_avoidTooManyOpenFiles()
 
-def _patch_avoidTooManyOpenFiles(softMaxConnections = 200, maxSeconds = 10, forceGCInterval = 200):
     if not _applied['avoidTooManyOpenFiles']:
         _applied['avoidTooManyOpenFiles'] = True
-        openConnections = _LeakySemaphore(softMaxConnections, maxSeconds)
+        _openConnectionsSettings = settings
+        openConnections = _openConnections = _LeakySemaphore(softMaxConnections, maxSeconds)
         openConnections.forceGCCounter = 0
-
-        def _simple_new_connect(self):
-            if not hasattr(self, '_simple_acquire'):
-                self._simple_acquire = True
-                openConnections.acquire()
-                if openConnections.waiting > 0:
-                    if openConnections.forceGCCounter > forceGCInterval:
-                        openConnections.forceGCCounter = 0
-                        collect()
-
-            if hasattr(self, '_simple_old_connect'):
-                self._simple_old_connect()
-            else:
-                super(HTTPConnection, self).connect()
-
-        if hasattr(HTTPConnection, 'connect'):
-            HTTPConnection._simple_old_connect = HTTPConnection.connect
-        HTTPConnection.connect = _simple_new_connect
-
-        if hasattr(HTTPSConnection, 'connect'):
-            HTTPSConnection._simple_old_connect = HTTPSConnection.connect
-            HTTPSConnection.connect = _simple_new_connect
-
-
-        def _simple_new_close(self):
-            if hasattr(self, '_simple_acquire'):
-                del self._simple_acquire
-                openConnections.release()
-            if hasattr(self, '_simple_old_close'):
-                self._simple_old_close()
-            else:
-                super(HTTPConnection, self).close()
-
-        if hasattr(HTTPConnection, 'close'):
-            HTTPConnection._simple_old_close = HTTPConnection.close
-        HTTPConnection.close = _simple_new_close
-
-        if hasattr(HTTPSConnection, 'close'):
-            HTTPSConnection._simple_old_close = HTTPSConnection.close
-            HTTPSConnection.close = _simple_new_close
+        acquired = WeakSet() # Connections currently holding a slot
+
+        def wrapConnect(connect):
+            def _simple_new_connect(self):
+                if self not in acquired:
+                    # Only take ownership once a slot is actually held; a greenlet killed while waiting must not release one
+                    waited = openConnections.acquire()
+                    acquired.add(self)
+                    if waited:
+                        openConnections.forceGCCounter += 1
+                        if openConnections.forceGCCounter >= forceGCInterval:
+                            openConnections.forceGCCounter = 0
+                            collect(forceGCGeneration)
+                connect(self)
+            return _simple_new_connect
+
+        def wrapClose(close):
+            def _simple_new_close(self):
+                if self in acquired:
+                    acquired.discard(self)
+                    openConnections.release()
+                close(self)
+            return _simple_new_close
+
+        for cls in ( HTTPConnection, HTTPSConnection ):
+            for name, wrap in ( ( 'connect', wrapConnect ), ( 'close', wrapClose ) ):
+                # Subclasses that inherit the method are already covered by the wrapped base class
+                if cls is HTTPConnection or name in cls.__dict__:
+                    _patchMethod(cls, name, wrap)
 
 def _unpatch_avoidTooManyOpenFiles():
+    global _openConnections, _openConnectionsSettings
     if _applied['avoidTooManyOpenFiles']:
         _applied['avoidTooManyOpenFiles'] = False
 
-        openConnections.stop()
+        _openConnections.stop()
+        _openConnections = None
+        _openConnectionsSettings = None
 
-        if hasattr(HTTPConnection, '_simple_old_connect'):
-            HTTPConnection.connect = HTTPConnection._simple_old_connect
-            del HTTPConnection._simple_old_connect
-        else:
-            del HTTPConnection.connect
-
-        if hasattr(HTTPSConnection, '_simple_old_connect'):
-            HTTPSConnection.connect = HTTPSConnection._simple_old_connect
-            del HTTPSConnection._simple_old_connect
+        while len(_patchedMethods):
+            cls, name, original = _patchedMethods.pop()
+            if original is None:
+                delattr(cls, name)
+            else:
+                setattr(cls, name, original)
 
 
-        if hasattr(HTTPConnection, '_simple_old_close'):
-            HTTPConnection.close = HTTPConnection._simple_old_close
-            del HTTPConnection._simple_old_close
-        else:
-            del HTTPConnection.close
+_patchedMethods = [] # ( class, name, original ), where original is None if the class inherited the method
 
-        if hasattr(HTTPSConnection, '_simple_old_close'):
-            HTTPSConnection.close = HTTPSConnection._simple_old_close
-            del HTTPSConnection._simple_old_close
+def _patchMethod(cls, name, wrap):
+    """Replace cls.name with wrap(original), where the original is resolved once, here, rather than on every call"""
+    _patchedMethods.append(( cls, name, cls.__dict__.get(name) ))
+    setattr(cls, name, wrap(getattr(cls, name)))
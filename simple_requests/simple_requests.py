@@ -58,21 +58,19 @@ API
 """
 
 from atexit import register
-from bisect import bisect_right
-from collections import OrderedDict
+from collections import deque
+from heapq import heappop, heappush
 from sys import exc_info
-from time import time
-from weakref import WeakSet
 
 from gevent import Greenlet, GreenletExit, killall, sleep
-from gevent.event import Event
+from gevent.hub import Waiter, get_hub
 from gevent.pool import Pool
 
-from requests import PreparedRequest, Request, Response, Session
-from requests.adapters import HTTPAdapter
+from requests import PreparedRequest, Request, Session
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
 
-from compat import HTTPError
-from strategy import RetryStrategy, Strict
+from .compat import HTTPError, monotonic
+from .strategy import RetryStrategy, Strict
 
 
 class ResponsePreprocessor(object):
@@ -99,6 +97,43 @@ class ResponsePreprocessor(object):
 
 
 class Bundle(object):
+    """Bundles up a request with its outcome; passed to the methods of
+    :class:`ResponsePreprocessor` and :class:`RetryStrategy`.
+
+    To keep the memory footprint down, only the attributes below can be set
+    (along with a few private ones used internally).  Assigning any other
+    attribute raises an :class:`AttributeError`; use :attr:`obj` to carry
+    extra data along with the request instead.
+
+    .. attribute:: request
+
+        The request as it was passed in: a URL, :class:`requests.Request` or
+        :class:`requests.PreparedRequest`.
+
+    .. attribute:: response
+
+        The :class:`requests.Response`, or None if there isn't one (yet).
+
+    .. attribute:: exception
+
+        The exception raised while sending the request, if any.
+
+    .. attribute:: traceback
+
+        The traceback of :attr:`exception`.
+
+    .. attribute:: obj
+
+        The object the request was made for (see :meth:`Requests.each`).
+
+    .. attribute:: hasobj
+
+        True if :attr:`obj` was set, so that :meth:`ret` returns it along
+        with the response.
+    """
+    __slots__ = ( 'request', 'response', 'exception', 'traceback', 'obj', 'hasobj', '_stopped',
+                  '_responseIterator', '_group', '_requestIndex', '_numTries' ) # The last four are only set once the request is dispatched
+
     def __init__(self, request):
         self.request = request
         self.response = None
@@ -106,19 +141,59 @@ class Bundle(object):
         self.traceback = None
         self.obj = None
         self.hasobj = False
+        self._stopped = False
 
     def ret(self):
         return ( self.response, self.obj ) if self.hasobj else self.response
 
 
+class _Signal(object):
+    """A lightweight stand-in for :class:`gevent.event.Event`.
+
+    Calling :meth:`set` wakes every greenlet that is currently waiting, and does nothing while
+    nobody is; waiters always re-check their condition before calling :meth:`wait`, so there's
+    no state to remember (and no clear() needed).  Several greenlets may consume the same
+    iterator, so more than one can be waiting at a time.
+    """
+    def __init__(self):
+        self._waiters = []
+
+    def set(self):
+        if self._waiters:
+            waiters, self._waiters = self._waiters, []
+            loop = get_hub().loop
+            for waiter in waiters:
+                # Waiter.switch must be called from the hub
+                loop.run_callback(waiter.switch, None)
+
+    def wait(self, timeout = None):
+        waiter = Waiter()
+        self._waiters.append(waiter)
+        timer = None
+        if timeout is not None:
+            timer = get_hub().loop.timer(max(timeout, 0))
+            timer.start(waiter.switch, None)
+        try:
+            waiter.get()
+        finally:
+            if timer is not None:
+                timer.stop()
+            # Still registered if woken by the timeout (or killed) rather than by set()
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+
 class _ResponseIterator(object):
     _global_counter = 0
 
-    def __init__(self, maintainOrder, preprocessor):
+    def __init__(self, maintainOrder, preprocessor, maxBuffered, requestAdded):
         self._currentIndex = 0 if maintainOrder else None
         self._preprocessor = preprocessor
-        self._responseAdded = Event()
-        self._responses = OrderedDict()
+        self._maxBuffered = maxBuffered
+        self._requestAdded = requestAdded
+        self._responseAdded = _Signal()
+        # Unordered responses are simply handed out first-come, first-served; ordered ones are looked up by index
+        self._responses = {} if maintainOrder else deque()
         
         # A request is in-flight the moment it is popped off the request queue, until it is either added to this iterator or discarded (due to being killed)
         # The "done" variable is necessary to handle some corner cases, such as right at the beginning before the first request is in-flight
@@ -134,24 +209,32 @@ class _ResponseIterator(object):
     def __iter__(self):
         return self
 
+    def _full(self):
+        """Whether enough responses are buffered (or will be, once the in-flight requests finish) that no more requests should be sent for now"""
+        return self._maxBuffered is not None and self._inflight + len(self._responses) >= self._maxBuffered
+
     def _add(self, bundle, requestIndex):
-        if self._responses is not None:
+        if self._currentIndex is None:
+            self._responses.append(bundle)
+        else:
             self._responses[requestIndex] = bundle
         self._inflight -= 1
-        #print('(Notify it.) %s [%d] %d, %s, %d, %s' % ( time(), self._counter, self._inflight, self._done, len(self._responses), bundle.request.url ))
-        self._responseAdded.set()
+        #print('(Notify it.) %s [%d] %d, %s, %d, %s' % ( monotonic(), self._counter, self._inflight, self._done, len(self._responses), bundle.request.url ))
+        # When maintaining order, any other response is of no use to the consumer yet, so don't bother waking it
+        if self._currentIndex is None or requestIndex == self._currentIndex:
+            self._responseAdded.set()
 
     def next(self):
         while True:
-            #print('(Loop it.  ) %s [%d] %d, %s, %d' % ( time(), self._counter, self._inflight, self._done, len(self._responses) ))
-            if self._inflight == 0 and self._done and (self._responses is None or len(self._responses) == 0):
+            #print('(Loop it.  ) %s [%d] %d, %s, %d' % ( monotonic(), self._counter, self._inflight, self._done, len(self._responses) ))
+            if self._inflight == 0 and self._done and len(self._responses) == 0:
                 raise StopIteration
 
             found = False
-            if self._responses is not None and len(self._responses) > 0:
+            if len(self._responses) > 0:
                 if self._currentIndex is None:
                     found = True
-                    bundle = self._responses.popitem(last = False)[1]
+                    bundle = self._responses.popleft()
                 else:
                     if self._currentIndex in self._responses:
                         found = True
@@ -159,52 +242,57 @@ class _ResponseIterator(object):
                         self._currentIndex += 1
 
             if found:
-                #print('(Return it.) %s [%d] %d, %s, %d, %s' % ( time(), self._counter, self._inflight, self._done, len(self._responses), bundle.request.url ))
+                if self._maxBuffered is not None and self._inflight + len(self._responses) == self._maxBuffered - 1:
+                    # Just made room, so more requests may be sent
+                    self._requestAdded.set()
+
+                #print('(Return it.) %s [%d] %d, %s, %d, %s' % ( monotonic(), self._counter, self._inflight, self._done, len(self._responses), bundle.request.url ))
                 if bundle.exception is None:
                     return self._preprocessor.success(bundle)
                 else:
                     return self._preprocessor.error(bundle)
             else:
-                #print('(Wait it.  ) %s [%d] %d, %s, %d' % ( time(), self._counter, self._inflight, self._done, len(self._responses) ))
-                self._responseAdded.clear()
+                #print('(Wait it.  ) %s [%d] %d, %s, %d' % ( monotonic(), self._counter, self._inflight, self._done, len(self._responses) ))
                 self._responseAdded.wait()
 
 
 class _RequestQueue(object):
     def __init__(self):
-        self.queue = [] # requestIterator, nextRequest, responseIterator, group, requestIndex
+        self.queue = deque() # requestIterator, nextRequest, responseIterator, group, requestIndex
         self.group = 0
 
     def add(self, requestIterator, responseIterator):
         try:
             next = requestIterator.next()
-            self.queue.insert(0, [ requestIterator, next, responseIterator, self.group, 0 ])
+            self.queue.appendleft([ requestIterator, next, responseIterator, self.group, 0 ])
             self.group += 1
         except StopIteration:
             responseIterator._done = True
 
     def getLatestGroup(self):
-        if len(self.queue):
-            return self.queue[0][3]
-        else:
-            return None
+        # Groups whose iterators are full are passed over, so that older groups can still make progress
+        for index, status in enumerate(self.queue):
+            if not status[2]._full():
+                self.latestIndex = index
+                return status[3]
+        return None
 
     def pop(self):
         """Assumes getLatestGroup was called immediately before pop and returned not-None, on the same thread, with no slices in between"""
-        status = self.queue[0]
-        ret = tuple(status[1:])
+        status = self.queue[self.latestIndex]
+        request, requestIndex = status[1], status[4]
         status[2]._inflight += 1
         try:
             status[1] = status[0].next()
-            status[4] += 1
+            status[4] = requestIndex + 1
         except StopIteration:
-            self.queue.pop(0)
+            del self.queue[self.latestIndex]
             status[2]._done = True
-        return ret
+        return request, status[2], status[3], requestIndex
 
     def stop(self):
         while len(self.queue):
-            responseIterator = self.queue.pop(0)[2]
+            responseIterator = self.queue.popleft()[2]
             responseIterator._done = True
             if responseIterator._inflight == 0:
                 responseIterator._responseAdded.set()
@@ -212,45 +300,41 @@ class _RequestQueue(object):
 
 class _RetryQueue(object):
     def __init__(self):
-        self.timelist = []
-        self.sortedqueue = [] # bundle, responseIterator, group, requestIndex, numTries, nextAttempt
-
-    def add(self, bundle, responseIterator, group, requestIndex, numTries, wait):
-        nextAttempt = time() + wait
-        i = bisect_right(self.timelist, nextAttempt)
-        self.timelist.insert(i, nextAttempt)
-        self.sortedqueue.insert(i, ( bundle, responseIterator, group, requestIndex, numTries, nextAttempt ))
-
-    def getLatestGroup(self):
-        now = time()
-        self.maxStatus = None
-        index = 0
-        for s in self.sortedqueue[:bisect_right(self.timelist, now + 0.001)]: # Add a small epsilon to handle floating-point shenanigans
-            if self.maxStatus is None or self.maxStatus[2] < s[2]:
-                self.maxStatus = s
-                self.maxIndex = index
-            index += 1
-        return None if self.maxStatus is None else self.maxStatus[2]
-
-    def getMinWaitTime(self):
-        if len(self.timelist):
-            return self.timelist[0] - time()
+        self.waiting = [] # heap of ( nextAttempt, counter, bundle )
+        self.ready = [] # heap of ( -group, nextAttempt, counter, bundle ); retries whose time has come
+        self.counter = 0 # Tie-breaker, so that two bundles never need to be compared
+
+    def add(self, bundle, wait):
+        heappush(self.waiting, ( monotonic() + wait, self.counter, bundle ))
+        self.counter += 1
+
+    def getLatestGroup(self, now):
+        cutoff = now + 0.001 # Add a small epsilon to handle floating-point shenanigans
+        while len(self.waiting) and self.waiting[0][0] <= cutoff:
+            nextAttempt, counter, bundle = heappop(self.waiting)
+            heappush(self.ready, ( -bundle._group, nextAttempt, counter, bundle ))
+        return -self.ready[0][0] if len(self.ready) else None
+
+    def getMinWaitTime(self, now):
+        if len(self.ready):
+            return 0
+        elif len(self.waiting):
+            return self.waiting[0][0] - now
         else:
             return None
 
     def pop(self):
         """Assumes getLatestGroup was called immediately before pop and returned not-None, on the same thread, with no slices in between"""
-        del self.timelist[self.maxIndex]
-        del self.sortedqueue[self.maxIndex]
-        return self.maxStatus[:5]
+        return heappop(self.ready)[3]
 
     def stop(self):
-        while len(self.sortedqueue):
-            responseIterator = self.sortedqueue.pop(0)[1]
+        for entry in self.waiting + self.ready:
+            responseIterator = entry[-1]._responseIterator
             responseIterator._inflight -= 1
             if responseIterator._inflight == 0:
                 responseIterator._responseAdded.set()
-        self.timelist = []
+        self.waiting = []
+        self.ready = []
 
 
 class _DefaultTimeoutHTTPAdapter(HTTPAdapter):
@@ -270,7 +354,10 @@ class Requests(object):
                        allowed for this instance.
     :param minSecondsBetweenRequests: (optional) Every request is guaranteed to
                                       be separated by at least this many
-                                      seconds.
+                                      seconds.  This only caps the rate;
+                                      if the pool was busy for longer than
+                                      this anyways, the next request is
+                                      sent right away.
     :param defaultTimeout: (Optional) Stop waiting after the server is
                            unresponsive for this many seconds.  See
                            `the requests docs <http://docs.python-requests.org/en/latest/user/quickstart/#timeouts>`_
@@ -294,10 +381,23 @@ class Requests(object):
                                  Useful if you need to override the default
                                  handling of successful responses and/or failed
                                  responses.
+    :param maxBufferedResponses: (optional) Stop sending the requests of a
+                                 :meth:`swarm` or :meth:`each` once this many
+                                 of its responses are either waiting to be
+                                 iterated over or still in-flight, which keeps
+                                 memory use down when responses are consumed
+                                 slowly.  Other swarms carry on in the
+                                 meantime.  Note that if an iterator is
+                                 abandoned part-way, its remaining requests
+                                 will never be sent.  Must be at least 1.  By
+                                 default, there is no limit.
     .. attribute:: session
 
         An instance of :class:`requests.Session` that manages things like
-        maintaining cookies between requests.
+        maintaining cookies between requests.  Response bodies are downloaded
+        in full before a response is returned; set ``session.stream = True``
+        to defer that until the body is read, but note that each connection
+        is then held until its response is either fully read or closed.
 
     .. attribute:: pool
 
@@ -305,32 +405,46 @@ class Requests(object):
         maintaining the number of concurrent requests.  Changes to this object
         should be done before any requests are sent.
     """
-    def __init__(self, concurrent = 2, minSecondsBetweenRequests = 0.15, defaultTimeout = None, retryStrategy = Strict(), responsePreprocessor = ResponsePreprocessor()):
+    def __init__(self, concurrent = 2, minSecondsBetweenRequests = 0.15, defaultTimeout = None, retryStrategy = Strict(), responsePreprocessor = ResponsePreprocessor(), maxBufferedResponses = None):
         if not isinstance(retryStrategy, RetryStrategy):
             raise TypeError('retryStrategy must be an instance of RetryStrategy, not %s' % type(retryStrategy))
 
         if not isinstance(responsePreprocessor, ResponsePreprocessor):
             raise TypeError('responsePreprocessor must be an instance of ResponsePreprocessor, not %s' % type(responsePreprocessor))
 
+        self.maxBufferedResponses = maxBufferedResponses # Checked by the setter
+
         self.session = Session()
         self.pool = Pool(concurrent)
         self.minSecondsBetweenRequests = minSecondsBetweenRequests
         self.retryStrategy = retryStrategy
         self.responsePreprocessor = responsePreprocessor
 
-        self._adapter = _DefaultTimeoutHTTPAdapter()
+        # Keep enough connections alive per host that every concurrent request can reuse one
+        self._adapter = _DefaultTimeoutHTTPAdapter(pool_maxsize = max(concurrent, DEFAULT_POOLSIZE))
         self.session.mount('http://', self._adapter)
         self.session.mount('https://', self._adapter)
         self._adapter.defaultTimeout = defaultTimeout
 
         self._requestGroups = 0
-        self._requestAdded = Event()
+        self._nextRequestTime = 0
+        self._requestAdded = _Signal()
         self._requestQueue = _RequestQueue()
         self._retryQueue = _RetryQueue()
 
         self._killed = False
+        self._closed = False
+        self._dispatcher = None # Spawned on first use
 
-        Requests._runningRequests.add(Greenlet.spawn(self._run))
+    @property
+    def maxBufferedResponses(self):
+        return self._maxBufferedResponses
+
+    @maxBufferedResponses.setter
+    def maxBufferedResponses(self, value):
+        if value is not None and (not isinstance(value, (int, long)) or value < 1):
+            raise ValueError('maxBufferedResponses must be None or an integer of at least 1, not %r' % (value,))
+        self._maxBufferedResponses = value
 
     @property
     def defaultTimeout(self):
@@ -340,27 +454,34 @@ class Requests(object):
     def defaultTimeout(self, value):
         self._adapter.defaultTimeout = value
 
-    def __del__(self):
-        self._kill()
-
     def _run(self):
+        # None of these change over the life of the instance, so look them up (and bind the methods) only once.
+        #  The session is deliberately left alone, since it is fair game to replace or patch it at any time
+        pool, requestQueue, retryQueue = self.pool, self._requestQueue, self._retryQueue
+        execute, response = self._execute, self._response
+
         while True:
             try:
-                self.pool.wait_available()
-                reqGroup = self._requestQueue.getLatestGroup()
-                retryGroup = self._retryQueue.getLatestGroup()
+                pool.wait_available()
+                now = monotonic()
+                reqGroup = requestQueue.getLatestGroup()
+                retryGroup = retryQueue.getLatestGroup(now)
 
                 if reqGroup is None and retryGroup is None:
                     if self._killed:
                         break
                     else:
-                        self._requestAdded.clear()
-                        self._requestAdded.wait(self._retryQueue.getMinWaitTime())
+                        self._requestAdded.wait(retryQueue.getMinWaitTime(now))
                         continue
-                
+
+                wait = self._nextRequestTime - now
+                if wait > 0:
+                    sleep(wait)
+                    # Something with a higher priority may have been added in the meantime
+                    continue
+
                 if retryGroup is None or (reqGroup is not None and reqGroup > retryGroup):
-                    request, responseIterator, group, requestIndex = self._requestQueue.pop()
-                    numTries = 0
+                    request, responseIterator, group, requestIndex = requestQueue.pop()
 
                     if isinstance(request, tuple):
                         bundle = Bundle(request[0])
@@ -374,40 +495,47 @@ class Requests(object):
                         continue
 
                     try:
-                        if isinstance(bundle.request, basestring):
-                            bundle.request = Request(method = 'GET', url = bundle.request)
-                        if isinstance(bundle.request, Request):
-                            bundle.request = self.session.prepare_request(bundle.request)
-                        if not isinstance(bundle.request, PreparedRequest):
-                            raise TypeError('Request must be an instance of: str (or unicode), Request, PreparedRequest, not %s.' % type(bundle.request))
+                        bundle.request = self._prepare(bundle.request)
                     except Exception as ex:
                         # An exception here isn't recoverable, so don't bother testing for retries
                         bundle.exception = ex
                         bundle.traceback = exc_info()[2]
                         responseIterator._add(bundle, requestIndex)
                         continue
+
+                    bundle._responseIterator = responseIterator
+                    bundle._group = group
+                    bundle._requestIndex = requestIndex
+                    bundle._numTries = 0
                 else:
-                    bundle, responseIterator, group, requestIndex, numTries = self._retryQueue.pop()
+                    bundle = retryQueue.pop()
 
-                #print('(Execute   ) %s [%d] %d, %s, %d, %s' % ( time(), responseIterator._counter, responseIterator._inflight, responseIterator._done, len(responseIterator._responses), bundle.request.url ))
-                g = Greenlet(self._execute, bundle)
+                #print('(Execute   ) %s [%d] %d, %s, %d, %s' % ( monotonic(), bundle._responseIterator._counter, bundle._responseIterator._inflight, bundle._responseIterator._done, len(bundle._responseIterator._responses), bundle.request.url ))
+                g = Greenlet(execute, bundle)
                 # Attach data as a property, right on the greenlet.  This way, we won't lose the information if the greenlet is killed before it starts
-                g.data = ( bundle, responseIterator, group, requestIndex, numTries )
-                g.rawlink(self._response)
-                self.pool.start(g)
+                g.data = bundle
+                g.rawlink(response)
+                pool.start(g)
 
-                if self.minSecondsBetweenRequests > 0:
-                    sleep(self.minSecondsBetweenRequests)
+                self._nextRequestTime = now + self.minSecondsBetweenRequests
 
             except GreenletExit:
-                self._kill()
+                # Killed by close() (with nothing left queued) or at exit (see _killall): finish what's queued, then stop
+                self._killed = True
 
     def _add(self, requestIterator, maintainOrder, responsePreprocessor):
+        if self._closed:
+            raise RuntimeError('This Requests instance has been closed')
         if responsePreprocessor is not None and not isinstance(responsePreprocessor, ResponsePreprocessor):
             raise TypeError('responsePreprocessor must be an instance of ResponsePreprocessor, not %s' % type(responsePreprocessor))
-        responseIterator = _ResponseIterator(maintainOrder, responsePreprocessor or self.responsePreprocessor)
+        responseIterator = _ResponseIterator(maintainOrder, responsePreprocessor or self.responsePreprocessor, self.maxBufferedResponses, self._requestAdded)
         self._requestQueue.add(requestIterator, responseIterator)
-        self._requestAdded.set()
+        if self._dispatcher is None:
+            self._dispatcher = Greenlet.spawn(self._run)
+            Requests._runningRequests.add(self._dispatcher)
+            self._dispatcher.rawlink(Requests._runningRequests.discard)
+        else:
+            self._requestAdded.set()
         return responseIterator
 
     def _skip(self, bundle):
@@ -419,58 +547,80 @@ class Requests(object):
         """
         return False
 
+    def _prepareString(self, request):
+        return self.session.prepare_request(Request(method = 'GET', url = request))
+
+    def _prepareRequest(self, request):
+        return self.session.prepare_request(request)
+
+    def _preparePreparedRequest(self, request):
+        return request
+
+    # Looked up by exact type, since that's a single hash instead of a chain of isinstance calls
+    _preparers = {
+        str: _prepareString,
+        unicode: _prepareString,
+        basestring: _prepareString,
+        Request: _prepareRequest,
+        PreparedRequest: _preparePreparedRequest
+    }
+
+    def _prepare(self, request):
+        prepare = self._preparers.get(type(request))
+        if prepare is None:
+            # Not one of the exact types, so it's either a subclass or not allowed at all
+            for base in ( basestring, Request, PreparedRequest ):
+                if isinstance(request, base):
+                    prepare = self._preparers[base]
+                    break
+            else:
+                raise TypeError('Request must be an instance of: str (or unicode), Request, PreparedRequest, not %s.' % type(request))
+        return prepare(self, request)
+
     def _execute(self, bundle):
         try:
             bundle.response = self.session.send(bundle.request)
             self.retryStrategy.verify(bundle)
             bundle.exception = None
             bundle.traceback = None
-        except (Exception, GreenletExit) as ex:
+        except Exception as ex:
             bundle.exception = ex
             bundle.traceback = exc_info()[2]
 
-        return None # bundle is already a property of the greenlet
+        return None # bundle is already a property of the greenlet; a GreenletExit propagates and becomes the value
 
     def _response(self, status):
-        bundle, responseIterator, group, requestIndex, numTries = status.data
-        numTries += 1
+        bundle = status.data
+        responseIterator = bundle._responseIterator
 
-        #print('(Response  ) %s [%d] %d, %s, %d, %s' % ( time(), responseIterator._counter, responseIterator._inflight, responseIterator._done, len(responseIterator._responses), bundle.request.url ))
+        #print('(Response  ) %s [%d] %d, %s, %d, %s' % ( monotonic(), responseIterator._counter, responseIterator._inflight, responseIterator._done, len(responseIterator._responses), bundle.request.url ))
 
         if status.value is not None:
-            if isinstance(status.value, GreenletExit):
-                bundle.exception = status.value
-            else:
-                raise Exception('Unexpected return value of greenlet: %s' % status.value)
-
-        if bundle.exception is None:
-            responseIterator._add(bundle, requestIndex)
-        elif isinstance(bundle.exception, GreenletExit):
-            # Execution was killed in-flight
+            # _execute always returns None, so the greenlet was killed, either in-flight or before it even started (the value is the GreenletExit)
             responseIterator._inflight -= 1
             if responseIterator._inflight == 0:
                 responseIterator._responseAdded.set()
+        elif bundle.exception is None:
+            # By far the most common case
+            responseIterator._add(bundle, bundle._requestIndex)
+        elif bundle._stopped:
+            # A stop was sent, so don't add to the retry queue regardless of strategy
+            responseIterator._add(bundle, bundle._requestIndex)
         else:
-            if hasattr(status, 'stopped'):
-                # A stop was sent, so don't add to the retry queue regardless of strategy
-                responseIterator._add(bundle, requestIndex)
+            bundle._numTries += 1
+            wait = self.retryStrategy.retry(bundle, bundle._numTries)
+            if wait >= 0:
+                self._retryQueue.add(bundle, wait)
+                self._requestAdded.set()
             else:
-                wait = self.retryStrategy.retry(bundle, numTries)
-                if wait >= 0:
-                    self._retryQueue.add(bundle, responseIterator, group, requestIndex, numTries, wait)
-                    self._requestAdded.set()
-                else:
-                    responseIterator._add(bundle, requestIndex)
-
-    def _kill(self):
-        """Define the actions that should be taken when this object is killed."""
-        self._killed = True
+                responseIterator._add(bundle, bundle._requestIndex)
 
-    _runningRequests = WeakSet()
+    _runningRequests = set()
 
     @staticmethod
     def _killall():
-        killall(tuple(Requests._runningRequests))
+        if len(Requests._runningRequests):
+            killall(tuple(Requests._runningRequests))
 
     def one(self, request, responsePreprocessor = None):
         """Execute one request synchronously.
@@ -486,7 +636,7 @@ class Requests(object):
                                      preprocessor for this request only.
         :returns: A :class:`requests.Response`.
         """
-        return self._add([ request ].__iter__(), False, responsePreprocessor).next()
+        return self._add(iter(( request, )), False, responsePreprocessor).next()
 
     def swarm(self, iterable, maintainOrder = True, responsePreprocessor = None):
         """Execute each request asynchronously.
@@ -517,7 +667,7 @@ class Requests(object):
         :returns: A :class:`ResponseIterator` that may be iterated over to get a
                   :class:`requests.Response` for each request.
         """
-        return self._add(iterable.__iter__(), maintainOrder, responsePreprocessor)
+        return self._add(iter(iterable), maintainOrder, responsePreprocessor)
 
     def each(self, iterable, mapToRequest = (lambda i: i.request), maintainOrder = False, responsePreprocessor = None):
         """Execute a request for each object.
@@ -577,6 +727,32 @@ class Requests(object):
             self.pool.kill()
         else:
             for greenlet in self.pool.greenlets:
-                setattr(greenlet, 'stopped', True)
+                greenlet.data._stopped = True
+
+    def close(self):
+        """Stop all requests and shut down this instance.
+
+        Any pending or executing requests are cancelled (as with
+        :meth:`stop`), the background greenlet is ended and the session's
+        connections are closed.  The instance must not be used afterwards.
+
+        Once a request has been sent, the background greenlet keeps the
+        instance alive, so it is never garbage collected; calling this method
+        is the only way to release it before the program exits.  Applications
+        that create many short-lived instances should therefore always call it
+        (or use the instance as a context manager, which calls it on exit).
+        Sending requests after closing raises a :class:`RuntimeError`.
+        """
+        self._closed = True
+        self.stop()
+        if self._dispatcher is not None:
+            self._dispatcher.kill()
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
 register(Requests._killall)
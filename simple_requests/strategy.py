@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from compat import HTTPError
+from .compat import HTTPError
 
 class RetryStrategy(object):
     """The base implementation, which doesn't retry at all."""
@@ -49,11 +49,12 @@ class Backoff(RetryStrategy):
 
     Other (non-HTTP) errors are retried only once after 10 seconds.
     """
+    _waits = ( 0.5, 1, 2, 4, 8, 16, 32, 60, 60, 60 )
+
     def retry(self, bundle, numTries):
         if isinstance(bundle.exception, HTTPError):
-            # Returns 0.5, 1, 2, 4, 8, 16, 32, 60, 60, 60, -1
-            if numTries < 11:
-                return min(2**(numTries-2), 60)
+            if numTries <= len(self._waits):
+                return self._waits[numTries-1]
             else:
                 return -1
         else:
@@ -8,7 +8,7 @@ of synthetic requests fall within a very tight time range (0.04 seconds).
 Slow computers, or running the tests in the background may fail these tests.
 """
 
-from gevent import sleep
+from gevent import sleep, spawn
 from random import random
 from re import compile
 from requests import Response, Session, Timeout
@@ -17,6 +17,9 @@ from types import MethodType
 from unittest import main, TestCase
 
 from simple_requests import *
+from simple_requests import monkey
+from socket import socket
+from requests.packages.urllib3.connection import HTTPConnection, HTTPSConnection
 
 patch(allowIncompleteResponses = True, avoidTooManyOpenFiles = True)
 
@@ -137,6 +140,38 @@ class Test1Logic(TestCase):
         self.assertEqual([ 'http://cat-videos.net/1', 'http://cat-videos.net/2', 'http://cat-videos.net/3', 'http://cat-videos.net/4', 'http://cat-videos.net/5', 'http://cat-videos.net/6' ], responses)
         self.highConcurrency.minSecondsBetweenRequests = oldValue
 
+    def test_async_max_buffered(self):
+        responses = []
+        oldValue = self.highConcurrency.maxBufferedResponses
+        self.highConcurrency.maxBufferedResponses = 2
+        start = time()
+        for r1 in self.highConcurrency.swarm([ 'http://cat-videos.net/1/OK:200', 'http://cat-videos.net/2/OK:200', 'http://cat-videos.net/3/OK:200', 'http://cat-videos.net/4/OK:200' ]):
+            if len(responses) == 0:
+                # Responses 2 and 3 fill up the buffer, so request 4 is only sent once response 2 is consumed
+                sleep(1)
+            responses.append(r1.url)
+
+        self.assertAlmostEqual(time() - start, 1 + self.defaultSendTime * 2, delta = 0.04)
+        self.assertEqual([ 'http://cat-videos.net/1', 'http://cat-videos.net/2', 'http://cat-videos.net/3', 'http://cat-videos.net/4' ], responses)
+        self.highConcurrency.maxBufferedResponses = oldValue
+
+    def test_async_max_buffered_invalid(self):
+        for value in ( 0, -1, 1.5, '2' ):
+            self.assertRaises(ValueError, Requests, maxBufferedResponses = value)
+            self.assertRaises(ValueError, setattr, self.default, 'maxBufferedResponses', value)
+        self.assertIsNone(self.default.maxBufferedResponses)
+
+    def test_async_shared_iterator(self):
+        # Like a worker pool: several greenlets consume the same swarm, and all of them finish
+        urls = [ 'http://cat-videos.net/%d/OK:200' % i for i in range(1, 7) ]
+        it = self.highConcurrency.swarm(urls, maintainOrder = False)
+        consumers = [ spawn(list, it) for i in range(3) ]
+
+        responses = []
+        for g in consumers:
+            responses.extend(g.get(timeout = 5))
+        self.assertEqual(sorted(r.url for r in responses), [ 'http://cat-videos.net/%d' % i for i in range(1, 7) ])
+
     def test_async_order1(self):
         responses = []
         start = time()
@@ -490,6 +525,30 @@ class Test1Logic(TestCase):
         except StopIteration:
             self.assertAlmostEqual(time() - start, 0.1, delta = 0.04)
 
+    def test_close(self):
+        start = time()
+        it =  self.noRaise.swarm([ 'http://cat-videos.net/1/OK:200', 'http://cat-videos.net/2/OK:200' ])
+        sleep(0.1)
+        self.noRaise.close()
+        self.assertRaises(StopIteration, it.next)
+        self.assertAlmostEqual(time() - start, 0.1, delta = 0.04)
+        self.assertTrue(self.noRaise._dispatcher.dead)
+        self.assertNotIn(self.noRaise._dispatcher, Requests._runningRequests)
+
+    def test_close_context_manager(self):
+        with self.default as requests:
+            self.assertEqual(requests.one('http://cat-videos.net/1/OK:200').url, 'http://cat-videos.net/1')
+        self.assertTrue(self.default._dispatcher.dead)
+
+    def test_closed_raises(self):
+        self.default.one('http://cat-videos.net/1/OK:200')
+        self.default.close()
+
+        start = time()
+        self.assertRaises(RuntimeError, self.default.one, 'http://cat-videos.net/2/OK:200')
+        self.assertRaises(RuntimeError, self.default.swarm, [ 'http://cat-videos.net/3/OK:200' ])
+        self.assertLess(time() - start, 0.04)
+
     def test_custom_preprocessor(self):
         class CustomPreprocessor(ResponsePreprocessor):
             def success(self, bundle):
@@ -620,5 +679,149 @@ class Test3InFlight(TestCase):
         print '\n*** This is an eyeball test: make sure all 5 urls are printed to the console ***'
         requests.swarm([ 'http://cat-videos.net/1-of-5', 'http://cat-videos.net/2-of-5', 'http://cat-videos.net/3-of-5', 'http://cat-videos.net/4-of-5', 'http://cat-videos.net/5-of-5' ])
 
+class Test4Monkey(TestCase):
+    def setUp(self):
+        patch(allowIncompleteResponses = True, avoidTooManyOpenFiles = False)
+
+    def tearDown(self):
+        # Back to what the module-level patch() applied
+        patch(allowIncompleteResponses = True, avoidTooManyOpenFiles = False)
+        patch(allowIncompleteResponses = True, avoidTooManyOpenFiles = True)
+
+    def connection(self):
+        # Nothing listens on a port that was just released, so connect() fails fast without a network
+        s = socket()
+        s.bind(( '127.0.0.1', 0 ))
+        port = s.getsockname()[1]
+        s.close()
+        return HTTPConnection('127.0.0.1', port)
+
+    def connect(self, connection):
+        try:
+            connection.connect()
+        except Exception:
+            pass
+
+    def test_killed_while_throttled(self):
+        patch(allowIncompleteResponses = True, avoidTooManyOpenFiles = True, softMaxConnections = 1)
+        openConnections = monkey._openConnections
+
+        holder, killed = self.connection(), self.connection()
+        self.connect(holder) # Keeps the only slot until closed
+
+        g = spawn(self.connect, killed)
+        sleep(0)
+        self.assertEqual(openConnections.waiting, 1)
+        g.kill()
+        killed.close() # As urllib3 does when connect() fails
+
+        self.assertEqual(openConnections.waiting, 0)
+        self.assertEqual(openConnections.inUse, 1)
+        self.assertEqual(openConnections._semaphore.counter, 0)
+
+        holder.close()
+        self.assertEqual(openConnections.inUse, 0)
+        self.assertEqual(openConnections._semaphore.counter, 1)
+
+    def test_release_bound(self):
+        semaphore = monkey._LeakySemaphore(1)
+        semaphore.acquire()
+        semaphore.release()
+        self.assertRaises(ValueError, semaphore.release)
+        self.assertEqual(semaphore.inUse, 0)
+
+    def test_patch_round_trip(self):
+        originals = dict(( ( cls, name ), cls.__dict__.get(name) ) for cls in ( HTTPConnection, HTTPSConnection ) for name in ( 'connect', 'close' ))
+        for method in originals.values():
+            self.assertFalse(method is not None and method.__name__.startswith('_simple_new_'))
+
+        patch(allowIncompleteResponses = True, avoidTooManyOpenFiles = True)
+        self.assertNotEqual(HTTPConnection.__dict__['connect'], originals[( HTTPConnection, 'connect' )])
+        self.assertNotEqual(HTTPConnection.__dict__['close'], originals[( HTTPConnection, 'close' )])
+
+        patch(allowIncompleteResponses = True, avoidTooManyOpenFiles = False)
+        for ( cls, name ), method in originals.items():
+            self.assertIs(cls.__dict__.get(name), method)
+        self.assertIsNone(monkey._openConnections)
+
+    def test_repatch_new_settings(self):
+        patch(allowIncompleteResponses = True, avoidTooManyOpenFiles = True, softMaxConnections = 1)
+        first = monkey._openConnections
+        numPatched = len(monkey._patchedMethods)
+
+        patch(allowIncompleteResponses = True, avoidTooManyOpenFiles = True, softMaxConnections = 1)
+        self.assertIs(monkey._openConnections, first)
+
+        patch(allowIncompleteResponses = True, avoidTooManyOpenFiles = True, softMaxConnections = 2)
+        self.assertIsNot(monkey._openConnections, first)
+        self.assertTrue(first._stopped)
+        self.assertEqual(monkey._openConnections._semaphore.counter, 2)
+        self.assertEqual(len(monkey._patchedMethods), numPatched)
+
+        second = monkey._openConnections
+        patch(allowIncompleteResponses = True, avoidTooManyOpenFiles = True, softMaxConnections = 2, forceGCGeneration = 0)
+        self.assertIsNot(monkey._openConnections, second)
+        self.assertEqual(monkey._openConnectionsSettings[3], 0)
+
+    def test_leak(self):
+        semaphore = monkey._LeakySemaphore(1, maxSeconds = 0.1)
+        self.assertFalse(semaphore.acquire())
+
+        start = time()
+        g = spawn(semaphore.acquire)
+        sleep(0)
+        self.assertEqual(semaphore.inUse, 1)
+        self.assertEqual(semaphore.waiting, 1)
+
+        self.assertTrue(g.get())
+        self.assertAlmostEqual(time() - start, 0.1, delta = 0.04)
+        self.assertEqual(semaphore.inUse, 2)
+        self.assertEqual(semaphore.waiting, 0)
+        semaphore.stop()
+
+    def test_leak_without_delay(self):
+        semaphore = monkey._LeakySemaphore(1, maxSeconds = 0)
+        semaphore.acquire()
+        waiters = [ spawn(semaphore.acquire) for i in range(2) ]
+        self.assertEqual([ g.get() for g in waiters ], [ True, True ])
+        self.assertEqual(semaphore.inUse, 3)
+        self.assertEqual(semaphore.waiting, 0)
+        semaphore.stop()
+
+    def test_stop_releases_waiters(self):
+        semaphore = monkey._LeakySemaphore(1)
+        semaphore.acquire()
+        waiters = [ spawn(semaphore.acquire) for i in range(3) ]
+        sleep(0)
+        self.assertEqual(semaphore.waiting, 3)
+
+        start = time()
+        semaphore.stop()
+        sleep(0)
+        self.assertLess(time() - start, 0.04)
+        self.assertTrue(all(g.dead for g in waiters))
+        self.assertEqual(semaphore.waiting, 0)
+
+    def test_force_gc(self):
+        collected = []
+        oldCollect = monkey.collect
+        monkey.collect = collected.append
+        try:
+            monkey._patch_avoidTooManyOpenFiles(1, maxSeconds = 0.01, forceGCInterval = 2, forceGCGeneration = 1)
+            connections = [ self.connection() for i in range(4) ]
+
+            self.connect(connections[0]) # Not throttled
+            self.connect(connections[1])
+            self.assertEqual(collected, [])
+            self.connect(connections[2])
+            self.assertEqual(collected, [ 1 ])
+            self.connect(connections[3])
+            self.assertEqual(collected, [ 1 ])
+
+            for connection in connections:
+                connection.close()
+        finally:
+            monkey.collect = oldCollect
+
 if __name__ == '__main__':
     main(verbosity = 2, catchbreak = True)